@@ -1,18 +1,29 @@
-from flask import Flask, jsonify, request
-import requests
-import numpy as np
-from scipy.spatial import KDTree
+import time
+_import_started = time.perf_counter()
+
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flask import Blueprint, Flask, Response, jsonify, request, stream_with_context
 from math import radians, sin, cos, sqrt, atan2, asin
 from model import Ass
 from cal_energy import estimate_asteroid_energy
 from flask_cors import CORS
-from pop import *
-from shapely.geometry import Polygon, mapping
-from impact import *
+from pop import get_total_population, get_zone_polygon, get_union_geometry, get_union_population
+from impact import calculate_impact_effects
+from jobs import create_population_job, get_population_job
+from catalogue import parse_time, query_nearby, ShardUnavailable, FETCH_RETRY_AFTER
+from compact import requested_format, compact_response, json_response, neo_columns, earthquake_columns
+# numpy, scipy and requests are imported where they are first needed to keep startup fast
 DEFAULT_KINETIC_ENERGY = 1000 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint("api", __name__)
 DEFAULT_DISTANCE_KM = 70
+# Max WorldPop calls in flight for one streaming request
+STREAM_MAX_WORKERS = 8
+RESPONSE_FORMATS = ("json", "columnar", "msgpack")
+# The NEO list is static, so its compact columns are built once
+NEO_COMPACT_COLUMNS = neo_columns(Ass)
 # -------------------------------
 # Global Earthquake Setup
 # -------------------------------
@@ -33,6 +44,16 @@ earthquake_metadata = []
 earthquake_tree = None
 selected_ass = {}
 
+# Set once the earthquake catalogue and its KD-tree are built
+earthquake_ready = threading.Event()
+CATALOGUE_RETRY_SECONDS = 30
+_catalogue_loader = None
+_catalogue_loader_lock = threading.Lock()
+startup_timings = {
+    "import_seconds": None,
+    "catalogue_load_seconds": None
+}
+
 
 
 # -------------------------------
@@ -56,9 +77,13 @@ def haversine(lat1, lon1, lat2, lon2):
 
 def load_earthquake_data():
     global earthquake_coords, earthquake_metadata, earthquake_tree
+    import requests
+    import numpy as np
+    from scipy.spatial import KDTree
 
     print("Fetching earthquake data...")
-    response = requests.get(EARTHQUAKE_API_URL, params=EARTHQUAKE_PARAMS)
+    # Bounded so a hung USGS connection can't stall the loader's retry loop forever
+    response = requests.get(EARTHQUAKE_API_URL, params=EARTHQUAKE_PARAMS, timeout=120)
 
     if response.status_code != 200:
         print("Failed to load earthquake data")
@@ -88,6 +113,38 @@ def load_earthquake_data():
     if earthquake_coords:
         earthquake_tree = KDTree(np.array(earthquake_coords))
         print(f"Loaded {len(earthquake_coords)} earthquake records.")
+        # Ready only once there is an index to query
+        earthquake_ready.set()
+    else:
+        print("No earthquake records returned")
+
+
+def _load_catalogue_until_ready():
+    started = time.perf_counter()
+    while not earthquake_ready.is_set():
+        try:
+            load_earthquake_data()
+        except Exception as e:
+            print(f"Failed to load earthquake data: {e}")
+        if not earthquake_ready.is_set():
+            time.sleep(CATALOGUE_RETRY_SECONDS)
+    startup_timings["catalogue_load_seconds"] = round(time.perf_counter() - started, 3)
+    print(f"Earthquake catalogue ready in {startup_timings['catalogue_load_seconds']}s")
+
+
+def start_catalogue_loader():
+    """Build the earthquake catalogue in a background thread so the server can start serving at once.
+
+    The catalogue lives in module globals, so only one loader ever runs per process.
+    """
+    global _catalogue_loader
+    with _catalogue_loader_lock:
+        if _catalogue_loader is None:
+            _catalogue_loader = threading.Thread(
+                target=_load_catalogue_until_ready, name="earthquake-catalogue", daemon=True
+            )
+            _catalogue_loader.start()
+    return _catalogue_loader
 
 
 
@@ -97,7 +154,6 @@ def load_earthquake_data():
 
 def get_nearby_earthquakes(lat, lon, radius_km=1000):
     if not earthquake_tree:
-        print("lol")
         return []
     # Approximate degrees (Euclidean space)
     approx_deg_radius = radius_km / 111.0
@@ -164,17 +220,41 @@ def deduplicate_by_distance(results, min_dist_km=100):
 # API Routes
 # -------------------------------
 
-@app.route('/earthquakes/nearby', methods=['GET'])
+@api.route('/earthquakes/nearby', methods=['GET'])
 def get_nearby_earthquakes_route():
     lat = request.args.get("lat", type=float)
     lon = request.args.get("lon", type=float)
+    fmt = requested_format()
 
     if lat is None or lon is None:
         return jsonify({"error": "Missing 'lat' or 'lon' query parameter"}), 400
+    if fmt not in RESPONSE_FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}'"}), 400
     print(lat,lon)
-    results = get_nearby_earthquakes(lat, lon, 800)
+    window_args = ("starttime", "endtime", "minmagnitude")
+    if any(arg in request.args for arg in window_args):
+        # Ad-hoc window: answer from the monthly shards instead of the preloaded default window
+        try:
+            start = parse_time(request.args.get("starttime", EARTHQUAKE_PARAMS["starttime"]))
+            end = parse_time(request.args.get("endtime", EARTHQUAKE_PARAMS["endtime"]))
+            min_magnitude = float(request.args.get("minmagnitude", EARTHQUAKE_PARAMS["minmagnitude"]))
+            results = query_nearby(lat, lon, 800, start, end, min_magnitude)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except ShardUnavailable as e:
+            # Missing months are being fetched in the background; the client should retry
+            return jsonify({"error": str(e), "missing_months": e.months}), 503, {"Retry-After": str(FETCH_RETRY_AFTER)}
+        except Exception as e:
+            return jsonify({"error": f"Failed to load earthquake data: {str(e)}"}), 502
+    else:
+        if not earthquake_ready.is_set():
+            # Still loading in the background; don't let this look like "no earthquakes nearby"
+            return jsonify({"error": "Earthquake data is still loading"}), 503, {"Retry-After": str(CATALOGUE_RETRY_SECONDS)}
+        results = get_nearby_earthquakes(lat, lon, 800)
     results = deduplicate_by_distance(results, 500)
-    return jsonify(results)
+    if fmt != "json":
+        return compact_response(earthquake_columns(results), fmt)
+    return json_response(results)
 
 
 # ----------------------
@@ -290,12 +370,17 @@ def get_nearby_earthquakes_route():
 # Server Startup
 # ----------------------
 
-@app.route('/neo', methods=['GET'])
+@api.route('/neo', methods=['GET'])
 def get_neo_data():
+    fmt = requested_format()
+    if fmt not in RESPONSE_FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}'"}), 400
+    if fmt != "json":
+        return compact_response(NEO_COMPACT_COLUMNS, fmt)
     data = Ass
-    return jsonify(data)
+    return json_response(data)
 
-@app.route("/energy", methods=["GET"])
+@api.route("/energy", methods=["GET"])
 def asteroid_energy_route():
     id = request.args.get("id")
     ass = {}
@@ -308,7 +393,7 @@ def asteroid_energy_route():
     result = estimate_asteroid_energy(ass)
     return jsonify(result)
 
-@app.route('/population', methods=['GET'])
+@api.route('/population', methods=['GET'])
 def get_population():
     try:
         # Get parameters from the URL query string]
@@ -326,6 +411,43 @@ def get_population():
     except Exception as e:
         return jsonify({"error": "An error occurred"}), 500
 
+@api.route('/population/jobs', methods=['POST'])
+def create_population_job_route():
+    # Jobs are kept in this process's memory; see jobs.py
+    try:
+        # silent: a missing or non-JSON body is a 400 below, not a 415 turned into a 500
+        data = request.get_json(silent=True) or {}
+        year = int(data.get('year', 2020))  # Default to 2020 if not provided
+        distance_km = float(data.get('distance_km', DEFAULT_DISTANCE_KM))
+
+        if data.get("locations"):
+            # Several zones: query their union so overlaps are counted once
+            geometry = get_union_geometry(data["locations"], distance_km)
+            scale = 1.0
+        else:
+            lat = float(data['lat'])
+            lon = float(data['lon'])
+            geometry = get_zone_polygon(lat, lon, distance_km)
+            # Same index scaling as /population
+            scale = int(data['index']) / 10 if 'index' in data else 1.0
+
+        job_id = create_population_job(geometry, year, scale)
+        return jsonify({"task_id": job_id, "status": "queued"}), 202
+
+    except KeyError as e:
+        return jsonify({"error": f"Missing parameter {e}"}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "An error occurred"}), 500
+
+@api.route('/population/jobs/<job_id>', methods=['GET'])
+def get_population_job_route(job_id):
+    job = get_population_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown task id"}), 404
+    return jsonify(job), 200
+
 # @app.route('/consequences', methods=['GET'])
 # def get_consequences():
 #     try:
@@ -418,7 +540,7 @@ def get_population():
 #     except Exception as e:
 #         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     
-@app.route('/get_population_and_impact_multiple', methods=['POST'])
+@api.route('/get_population_and_impact_multiple', methods=['POST'])
 def get_population_and_impact_multiplee():
     try:
         # Get list of latitudes and longitudes from the request body
@@ -427,23 +549,20 @@ def get_population_and_impact_multiplee():
         if not data or not data.get("locations"):
             return jsonify({"error": "Please provide a list of locations."}), 400
 
-        # Initialize the total population counter
-        total_population = 0
-
-        # Process each location in the list
+        # Group zones by year so each group can be merged into a single geometry
+        zones_by_year = {}
         for location in data["locations"]:
-            lat = location["lat"]
-            lon = location["lon"]
             year = location.get("year", 2020)  # Default to 2020 if not provided
+            zones_by_year.setdefault(year, []).append(location)
 
             # Get kinetic energy if provided, otherwise use the default value
             kinetic_energy = location.get("kinetic_energy", DEFAULT_KINETIC_ENERGY)
 
-            # Fetch population using WorldPop API with constant 70 km distance
-            location_population = get_total_population(lat, lon, DEFAULT_DISTANCE_KM, year)
-
-            # Add location's population to the total population
-            total_population += location_population
+        # One WorldPop query per year over the union of all 70 km zone boxes,
+        # so overlapping boxes are only counted once
+        total_population = 0
+        for year, locations in zones_by_year.items():
+            total_population += get_union_population(locations, DEFAULT_DISTANCE_KM, year)
 
         # Calculate the combined impact effects based on the total population and kinetic energy
         impact_details = calculate_impact_effects(kinetic_energy, total_population)
@@ -454,12 +573,160 @@ def get_population_and_impact_multiplee():
             "impact_effects": impact_details
         }
 
+        # Per-zone breakdown costs one extra WorldPop call per zone, so only on request
+        if data.get("breakdown"):
+            zones = []
+            for location in data["locations"]:
+                zone_population = get_total_population(
+                    location["lat"], location["lon"], DEFAULT_DISTANCE_KM, location.get("year", 2020)
+                )
+                zones.append({
+                    "lat": location["lat"],
+                    "lon": location["lon"],
+                    "total_population": zone_population
+                })
+            response["zones"] = zones
+
         return jsonify(response), 200
 
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
+@api.route('/get_population_and_impact_multiple/stream', methods=['POST'])
+def stream_population_and_impact_multiple():
+    """Stream one NDJSON record per zone as soon as its population resolves,
+    then a final aggregate record with the combined impact effects."""
+    data = request.get_json()
+
+    if not data or not data.get("locations"):
+        return jsonify({"error": "Please provide a list of locations."}), 400
+
+    locations = data["locations"]
+    # Validate everything up front: once streaming starts the status code is already sent
+    if not isinstance(locations, list):
+        return jsonify({"error": "'locations' must be a list."}), 400
+    for index, location in enumerate(locations):
+        try:
+            float(location["lat"])
+            float(location["lon"])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": f"Location {index} needs numeric 'lat' and 'lon'."}), 400
+
+    # Same rule as the non-streaming route: the last location's kinetic energy wins
+    kinetic_energy = locations[-1].get("kinetic_energy", DEFAULT_KINETIC_ENERGY)
+
+    zones_by_year = {}
+    for location in locations:
+        zones_by_year.setdefault(location.get("year", 2020), []).append(location)
+
+    def record(obj):
+        return json.dumps(obj, separators=(",", ":")) + "\n"
+
+    def generate():
+        pool = ThreadPoolExecutor(max_workers=STREAM_MAX_WORKERS)
+        try:
+            # The union queries for the aggregate run alongside the per-zone ones
+            union_futures = [
+                pool.submit(get_union_population, year_locations, DEFAULT_DISTANCE_KM, year)
+                for year, year_locations in zones_by_year.items()
+            ]
+
+            # Keep only a bounded window of zone queries pending so memory does not grow with zone count
+            zone_iter = iter(enumerate(locations))
+            pending = {}
+
+            def submit_next():
+                for index, location in zone_iter:
+                    future = pool.submit(
+                        get_total_population,
+                        float(location["lat"]), float(location["lon"]), DEFAULT_DISTANCE_KM, location.get("year", 2020)
+                    )
+                    pending[future] = (index, location)
+                    return True
+                return False
+
+            for _ in range(STREAM_MAX_WORKERS):
+                if not submit_next():
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, location = pending.pop(future)
+                    zone = {"type": "zone", "index": index, "lat": location["lat"], "lon": location["lon"]}
+                    try:
+                        zone_population = future.result()
+                        zone["total_population"] = zone_population
+                        zone["impact_effects"] = calculate_impact_effects(kinetic_energy, zone_population)
+                    except Exception as e:
+                        zone["error"] = str(e)
+                    yield record(zone)
+                    submit_next()
+
+            try:
+                total_population = sum(future.result() for future in union_futures)
+            except Exception as e:
+                yield record({"type": "aggregate", "error": f"An error occurred: {str(e)}"})
+                return
+
+            yield record({
+                "type": "aggregate",
+                "total_population": total_population,
+                "impact_effects": calculate_impact_effects(kinetic_energy, total_population)
+            })
+        finally:
+            # Runs on completion and when the client disconnects; don't wait on pending WorldPop calls
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # Tell reverse proxies not to buffer, otherwise records arrive all at once
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
+
+
+# -------------------------------
+# Health Checks
+# -------------------------------
+
+@api.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the process is up and serving requests
+    return jsonify({"status": "ok", **startup_timings}), 200
+
+@api.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: the earthquake index is built
+    if not earthquake_ready.is_set():
+        return jsonify({"status": "loading", **startup_timings}), 503
+    return jsonify({
+        "status": "ready",
+        "earthquake_records": len(earthquake_metadata),
+        **startup_timings
+    }), 200
+
+
+# -------------------------------
+# Application Factory
+# -------------------------------
+
+def create_app(load_catalogue=True):
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+    if load_catalogue:
+        start_catalogue_loader()
+    return app
+
+
+startup_timings["import_seconds"] = round(time.perf_counter() - _import_started, 3)
+
+# Module-level app for `flask run`, `gunicorn app:app` and existing deployments.
+# Set GOTG_LOAD_CATALOGUE=0 to import without starting the catalogue loader (e.g. in tests).
+app = create_app(load_catalogue=os.environ.get("GOTG_LOAD_CATALOGUE", "1") != "0")
+
 if __name__ == '__main__':
-    load_earthquake_data()
-    app.run(host='0.0.0.0', port=8080, debug=False)
\ No newline at end of file
+    print(f"app.py imported in {startup_timings['import_seconds']}s")
+    app.run(host='0.0.0.0', port=8080, debug=False)
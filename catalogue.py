@@ -0,0 +1,366 @@
+import os
+import io
+import json
+import time
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+# numpy, scipy and requests are imported on first shard load to keep startup fast
+
+EARTHQUAKE_API_URL = "https://earthquake.usgs.gov/fdsnws/event/1/query.geojson"
+SHARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "earthquakes")
+# Every shard holds all events at or above this magnitude
+SHARD_MIN_MAGNITUDE = 2.5
+# Upper bound on shards kept in memory at once. A month at M>=2.5 is a few thousand
+# events, well under 1 MB as arrays, so this is roughly 100-200 MB in the worst case.
+MAX_RESIDENT_SHARDS = 240
+# Upper bound on months a single query may span. Kept below MAX_RESIDENT_SHARDS so a
+# query never evicts its own shards and re-reads them on the next request.
+MAX_QUERY_MONTHS = 120
+# The current month is still changing, so its in-memory shard is refetched after this long (seconds)
+CURRENT_MONTH_TTL = 15 * 60
+# Suggested client retry delay while missing months are being fetched (seconds)
+FETCH_RETRY_AFTER = 30
+
+# "YYYY-MM" -> shard dict, least recently used first
+_resident_shards = OrderedDict()
+_resident_lock = threading.Lock()
+
+# Months waiting for the background fetcher, so each is queued only once
+_fetch_queue = queue.Queue()
+_queued_fetches = set()
+_fetch_lock = threading.Lock()
+_fetch_thread = None
+
+# String columns are stored as UTF-8 bytes so snapshots load without pickle
+_STRING_FIELDS = ("title", "place", "url")
+
+
+class ShardUnavailable(Exception):
+    """Some months have no local snapshot yet; they have been queued for a background fetch."""
+
+    def __init__(self, months):
+        self.months = sorted(months)
+        super().__init__(f"Earthquake data not available yet for {', '.join(self.months)}")
+
+
+# -------------------------------
+# Time Helpers
+# -------------------------------
+
+def parse_time(value):
+    """Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' (UTC) into an aware datetime."""
+    value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def months_between(start, end):
+    """Yield the "YYYY-MM" keys of every month that overlaps [start, end]."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield f"{year:04d}-{month:02d}"
+        year, month = _next_month(year, month)
+
+
+def _month_bounds(key):
+    year, month = map(int, key.split("-"))
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    end = datetime(*_next_month(year, month), 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def _is_finished(key):
+    return _month_bounds(key)[1] <= datetime.now(timezone.utc)
+
+
+# -------------------------------
+# Snapshots
+# -------------------------------
+
+def _shard_path(key):
+    return os.path.join(SHARD_DIR, f"{key}.npz")
+
+
+def shard_arrays(data):
+    """Turn one month of USGS geojson into compact column arrays sorted by magnitude (highest first)."""
+    import numpy as np
+
+    events = []
+    for eq in data.get("features", []):
+        props = eq["properties"]
+        if props.get("mag") is None:
+            continue
+        lon, lat = eq["geometry"]["coordinates"][:2]
+        events.append((props["mag"], lat, lon, props["time"], props.get("tsunami") or 0,
+                       props.get("title") or "", props.get("place") or "", props.get("url") or ""))
+    events.sort(key=lambda event: event[0], reverse=True)
+
+    arrays = {
+        # Negated so the array is ascending and searchsorted can find magnitude cut-offs
+        "neg_magnitudes": -np.array([event[0] for event in events], dtype=float),
+        "coords": np.array([[event[1], event[2]] for event in events], dtype=float).reshape(-1, 2),
+        "times": np.array([event[3] for event in events], dtype=np.int64),
+        "tsunami": np.array([event[4] for event in events], dtype=np.int8),
+    }
+    for offset, field in enumerate(_STRING_FIELDS, start=5):
+        arrays[field] = np.array([event[offset].encode("utf-8") for event in events], dtype=bytes)
+    return arrays
+
+
+def _save_snapshot(key, arrays):
+    import numpy as np
+
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    tmp_path = _shard_path(key) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, _shard_path(key))
+
+
+def _load_snapshot(key):
+    import numpy as np
+
+    with np.load(_shard_path(key), allow_pickle=False) as snapshot:
+        return {name: snapshot[name] for name in snapshot.files}
+
+
+def _fetch_month(key):
+    """Download one month from USGS and snapshot it to disk once the month is over.
+
+    Only called from the background fetcher and the offline job, never from a request.
+    Returns the shard arrays.
+    """
+    import requests
+
+    start, end = _month_bounds(key)
+    params = {
+        "starttime": start.strftime("%Y-%m-%d %H:%M:%S"),
+        "endtime": end.strftime("%Y-%m-%d %H:%M:%S"),
+        "minmagnitude": SHARD_MIN_MAGNITUDE,
+        "eventtype": "earthquake",
+        "orderby": "time",
+        "format": "geojson"
+    }
+    print(f"Fetching earthquake shard {key}...")
+    response = requests.get(EARTHQUAKE_API_URL, params=params, timeout=120)
+    response.raise_for_status()
+    arrays = shard_arrays(response.json())
+
+    # The current month is still changing, so only completed months are snapshotted
+    if end <= datetime.now(timezone.utc):
+        _save_snapshot(key, arrays)
+    return arrays
+
+
+# -------------------------------
+# Shard Loading
+# -------------------------------
+
+def build_shard(key, arrays):
+    """Wrap a month's arrays with a KD-tree over its coordinates."""
+    from scipy.spatial import KDTree
+
+    shard = dict(arrays)
+    shard["key"] = key
+    shard["tree"] = KDTree(arrays["coords"]) if len(arrays["coords"]) else None
+    # Only shards of unfinished months expire
+    shard["expires_at"] = None
+    return shard
+
+
+def _store_resident(shard):
+    with _resident_lock:
+        _resident_shards[shard["key"]] = shard
+        _resident_shards.move_to_end(shard["key"])
+        while len(_resident_shards) > MAX_RESIDENT_SHARDS:
+            _resident_shards.popitem(last=False)
+
+
+def _fetch_worker():
+    while True:
+        key = _fetch_queue.get()
+        if key is None:
+            # Shutdown signal
+            return
+        try:
+            arrays = _fetch_month(key)
+            if not _is_finished(key):
+                # No snapshot for the current month, keep it in memory for a while instead
+                shard = build_shard(key, arrays)
+                shard["expires_at"] = time.time() + CURRENT_MONTH_TTL
+                _store_resident(shard)
+            else:
+                # A snapshot now exists; drop any expired in-memory copy so the next request loads it
+                with _resident_lock:
+                    _resident_shards.pop(key, None)
+        except Exception as e:
+            print(f"Failed to fetch earthquake shard {key}: {e}")
+        finally:
+            with _fetch_lock:
+                _queued_fetches.discard(key)
+
+
+def request_fetch(key):
+    """Queue a month for the single background fetcher, unless it is already queued."""
+    global _fetch_thread
+    with _fetch_lock:
+        if key in _queued_fetches:
+            return
+        _queued_fetches.add(key)
+        if _fetch_thread is None or not _fetch_thread.is_alive():
+            _fetch_thread = threading.Thread(target=_fetch_worker, name="earthquake-shards", daemon=True)
+            _fetch_thread.start()
+    _fetch_queue.put(key)
+
+
+def stop_fetcher(timeout=5):
+    """Stop the background fetcher thread, if one is running."""
+    global _fetch_thread
+    with _fetch_lock:
+        thread = _fetch_thread
+        _fetch_thread = None
+    if thread is not None and thread.is_alive():
+        _fetch_queue.put(None)
+        thread.join(timeout)
+
+
+def get_shard(key):
+    """Return the indexed shard for a month from memory or its local snapshot.
+
+    Never downloads in the caller's thread: a missing month is queued for the
+    background fetcher and ShardUnavailable is raised. An expired current-month
+    shard keeps being served while its refresh runs.
+    """
+    if _month_bounds(key)[0] > datetime.now(timezone.utc):
+        raise ValueError(f"{key} is in the future")
+
+    with _resident_lock:
+        shard = _resident_shards.get(key)
+        if shard is not None:
+            _resident_shards.move_to_end(key)
+
+    if shard is not None:
+        if shard["expires_at"] is not None and shard["expires_at"] <= time.time():
+            request_fetch(key)
+        return shard
+
+    if not os.path.exists(_shard_path(key)):
+        legacy_path = os.path.join(SHARD_DIR, f"{key}.json")
+        if not os.path.exists(legacy_path):
+            request_fetch(key)
+            raise ShardUnavailable([key])
+        # Older raw-geojson snapshot: convert it once to the compact format
+        with open(legacy_path) as f:
+            _save_snapshot(key, shard_arrays(json.load(f)))
+
+    # Two requests may both load the same snapshot; the second simply replaces the first
+    shard = build_shard(key, _load_snapshot(key))
+    _store_resident(shard)
+    return shard
+
+
+# -------------------------------
+# Queries
+# -------------------------------
+
+def query_shard(shard, lat, lon, radius_km, start_ms, end_ms, min_magnitude):
+    import numpy as np
+
+    if shard["tree"] is None:
+        return []
+
+    # Events are sorted by magnitude, so everything below the cut-off is a prefix of the arrays
+    cutoff = int(np.searchsorted(shard["neg_magnitudes"], -min_magnitude, side="right"))
+    if cutoff == 0:
+        return []
+
+    candidates = np.array(shard["tree"].query_ball_point([lat, lon], r=radius_km / 111.0), dtype=int)
+    candidates = candidates[candidates < cutoff]
+    times = shard["times"][candidates]
+    candidates = candidates[(times >= start_ms) & (times <= end_ms)]
+    if candidates.size == 0:
+        return []
+
+    # Haversine on the survivors only
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2 = np.radians(shard["coords"][candidates, 0])
+    lon2 = np.radians(shard["coords"][candidates, 1])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    distances = 6371 * 2 * np.arcsin(np.sqrt(a))
+
+    # Same record shape as the preloaded default window, built only for matches
+    results = []
+    for i, dist in zip(candidates, distances):
+        if dist <= radius_km:
+            results.append({
+                "title": shard["title"][i].decode("utf-8"),
+                "place": shard["place"][i].decode("utf-8"),
+                "magnitude": float(-shard["neg_magnitudes"][i]),
+                "url": shard["url"][i].decode("utf-8"),
+                "tsunami": int(shard["tsunami"][i]),
+                "time": int(shard["times"][i]),
+                "lat": float(shard["coords"][i, 0]),
+                "lon": float(shard["coords"][i, 1]),
+                "distance_km": round(float(dist), 2)
+            })
+    return results
+
+
+def query_nearby(lat, lon, radius_km, start, end, min_magnitude=SHARD_MIN_MAGNITUDE):
+    """Earthquakes within radius_km of a point between start and end (datetimes) at or above min_magnitude.
+
+    Only the month shards overlapping the window are touched. Results are ordered by
+    magnitude, highest first, like the default USGS window.
+    """
+    if end < start:
+        raise ValueError("endtime must not be before starttime")
+    if min_magnitude < SHARD_MIN_MAGNITUDE:
+        raise ValueError(f"minmagnitude must be at least {SHARD_MIN_MAGNITUDE}")
+
+    # Nothing exists after now, so never touch future months
+    end = min(end, datetime.now(timezone.utc))
+    if start > end:
+        return []
+    months = list(months_between(start, end))
+    # Never more months than the cache holds, otherwise the query evicts its own shards
+    max_months = min(MAX_QUERY_MONTHS, MAX_RESIDENT_SHARDS)
+    if len(months) > max_months:
+        raise ValueError(f"Time window spans {len(months)} months, at most {max_months} are allowed")
+
+    start_ms = int(start.timestamp() * 1000)
+    end_ms = int(end.timestamp() * 1000)
+    results = []
+    missing = []
+    for key in months:
+        try:
+            shard = get_shard(key)
+        except ShardUnavailable:
+            # Keep going so every missing month in the window gets queued at once
+            missing.append(key)
+            continue
+        results.extend(query_shard(shard, lat, lon, radius_km, start_ms, end_ms, min_magnitude))
+    if missing:
+        raise ShardUnavailable(missing)
+    results.sort(key=lambda eq: eq["magnitude"], reverse=True)
+    return results
+
+
+if __name__ == '__main__':
+    # Offline snapshot job: python catalogue.py 2000-01 2024-12
+    import sys
+
+    first, last = (parse_time(f"{month}-01") for month in sys.argv[1:3])
+    for key in months_between(first, min(last, datetime.now(timezone.utc))):
+        if os.path.exists(_shard_path(key)) or not _is_finished(key):
+            continue
+        _fetch_month(key)
+        print(f"Saved {_shard_path(key)}")
@@ -0,0 +1,134 @@
+import gzip
+import json
+from flask import Response, jsonify, request
+
+# Optional fast serializers / encoders, used when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLUMNAR_MIMETYPE = "application/vnd.gotg.columnar+json"
+MSGPACK_MIMETYPE = "application/msgpack"
+# Compressing tiny payloads costs more than it saves
+MIN_COMPRESS_BYTES = 1024
+
+NEO_COLUMNS = ("id", "name", "lat", "lon", "scale", "diameter_km_min", "diameter_km_max",
+               "velocity_km_s", "miss_distance_km", "close_approach_date", "hazardous")
+EARTHQUAKE_COLUMNS = ("title", "place", "magnitude", "url", "tsunami", "lat", "lon", "distance_km")
+
+
+def requested_format():
+    """Return "json" (the default), "columnar" or "msgpack" from ?format= or the Accept header."""
+    fmt = request.args.get("format")
+    if fmt:
+        return fmt.lower()
+    accept = request.accept_mimetypes
+    if accept.quality(MSGPACK_MIMETYPE) > 0 and accept.best == MSGPACK_MIMETYPE:
+        return "msgpack"
+    if accept.quality(COLUMNAR_MIMETYPE) > 0 and accept.best == COLUMNAR_MIMETYPE:
+        return "columnar"
+    return "json"
+
+
+def parse_latlong(latlong):
+    """("53.3097° N", "6.2216° W") -> (53.3097, -6.2216)"""
+    values = []
+    for part in latlong:
+        number, _, hemisphere = part.replace("°", "").partition(" ")
+        value = float(number)
+        values.append(-value if hemisphere.strip().upper() in ("S", "W") else value)
+    return tuple(values)
+
+
+def to_columns(rows, columns):
+    return {column: [row.get(column) for row in rows] for column in columns}
+
+
+def neo_columns(asteroids):
+    rows = []
+    for neo in asteroids:
+        lat, lon = parse_latlong(neo["latlong"]) if neo.get("latlong") else (None, None)
+        diameter = neo["estimated_diameter"]["kilometers"]
+        approach = (neo.get("close_approach_data") or [{}])[0]
+        rows.append({
+            "id": neo.get("id"),
+            "name": neo.get("name"),
+            "lat": lat,
+            "lon": lon,
+            "scale": neo.get("scale"),
+            "diameter_km_min": diameter["estimated_diameter_min"],
+            "diameter_km_max": diameter["estimated_diameter_max"],
+            "velocity_km_s": float(approach["relative_velocity"]["kilometers_per_second"]) if approach else None,
+            "miss_distance_km": float(approach["miss_distance"]["kilometers"]) if approach else None,
+            "close_approach_date": approach.get("close_approach_date"),
+            "hazardous": neo.get("is_potentially_hazardous_asteroid", False),
+        })
+    return to_columns(rows, NEO_COLUMNS)
+
+
+def earthquake_columns(earthquakes):
+    return to_columns(earthquakes, EARTHQUAKE_COLUMNS)
+
+
+def _dumps_json(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _compress(body):
+    """Pick br or gzip from Accept-Encoding. Returns (body, encoding or None)."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    encodings = request.accept_encodings
+    if brotli is not None and encodings.quality("br") > 0:
+        return brotli.compress(body, quality=5), "br"
+    if encodings.quality("gzip") > 0:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def json_response(obj):
+    """Plain jsonify response for endpoints that also serve compact formats.
+
+    The format is negotiated on Accept, so shared caches must key on it for the default JSON too.
+    """
+    response = jsonify(obj)
+    response.vary.add("Accept")
+    return response
+
+
+def compact_response(columns, fmt):
+    """Serialize column arrays as columnar JSON or MessagePack, compressed when the client allows it."""
+    payload = {"count": len(next(iter(columns.values()), [])), "columns": columns}
+
+    if fmt == "msgpack":
+        if msgpack is None:
+            # 406 is for Accept negotiation; an explicit ?format= is just a bad parameter
+            status = 400 if request.args.get("format") else 406
+            response = Response(_dumps_json({"error": "MessagePack is not available on this server"}),
+                                status=status, mimetype="application/json")
+            response.vary.add("Accept")
+            return response
+        body, mimetype = msgpack.packb(payload, use_bin_type=True), MSGPACK_MIMETYPE
+    else:
+        body, mimetype = _dumps_json(payload), COLUMNAR_MIMETYPE
+
+    body, encoding = _compress(body)
+    response = Response(body, mimetype=mimetype)
+    response.vary.add("Accept")
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,216 @@
+import time
+import uuid
+import queue
+import threading
+
+from pop import chunk_geometry, submit_population_task, get_population_task, WorldPopTaskError
+
+# Backoff between polls of one WorldPop task (seconds)
+POLL_INITIAL_DELAY = 1.0
+POLL_MAX_DELAY = 30.0
+POLL_BACKOFF = 2.0
+# Give up on a task after this long (seconds)
+JOB_TIMEOUT = 15 * 60
+# Finished jobs are dropped from memory after this long (seconds)
+JOB_TTL = 60 * 60
+# Extra time before an open job past JOB_TIMEOUT is considered orphaned (seconds)
+ORPHAN_GRACE = 2 * POLL_MAX_DELAY
+
+# job_id -> job dict, shared between the web threads and the poller.
+# Jobs live in this process's memory only: run the API with a single worker process
+# (threads are fine), otherwise a status poll can land on a worker that never saw the job.
+population_jobs = {}
+_jobs_lock = threading.Lock()
+_new_jobs = queue.Queue()
+_poller_thread = None
+
+
+def _update_job(job_id, **fields):
+    with _jobs_lock:
+        job = population_jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+            job["updated_at"] = time.time()
+
+
+def create_population_job(geometry, year, scale=1.0):
+    """Queue a population query and return its job id straight away.
+
+    The result stored on the job is the WorldPop total multiplied by scale.
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _jobs_lock:
+        population_jobs[job_id] = {
+            "id": job_id,
+            "status": "queued",
+            "year": year,
+            "created_at": now,
+            "updated_at": now,
+        }
+    _new_jobs.put((job_id, geometry, year, scale))
+    start_job_poller()
+    return job_id
+
+
+def get_population_job(job_id):
+    """Return a copy of the job (status, and result once finished) or None."""
+    now = time.time()
+    with _jobs_lock:
+        job = population_jobs.get(job_id)
+        if job is None:
+            return None
+        # Checked here too, so a job stranded by a dead poller thread still ends up failed
+        if _is_orphaned(job, now):
+            job.update(status="failed", error="Job was lost by the poller", updated_at=now)
+        return dict(job)
+
+
+def _is_orphaned(job, now):
+    # The poller fails its own jobs at JOB_TIMEOUT; anything still open well past that has lost its poller
+    return (job["status"] in ("queued", "running")
+            and now - job["created_at"] > JOB_TIMEOUT + ORPHAN_GRACE)
+
+
+def _sweep_jobs(now):
+    """Drop old finished jobs and fail open ones nobody is polling any more."""
+    with _jobs_lock:
+        for job_id, job in list(population_jobs.items()):
+            if job["status"] in ("finished", "failed") and now - job["updated_at"] > JOB_TTL:
+                del population_jobs[job_id]
+            elif _is_orphaned(job, now):
+                job.update(status="failed", error="Job was lost by the poller", updated_at=now)
+
+
+def _start_job(job_id, geometry, year, scale):
+    """Split the job's geometry into request-sized chunks, one WorldPop task each."""
+    try:
+        chunks = chunk_geometry(geometry)
+    except Exception as e:
+        _update_job(job_id, status="failed", error=str(e))
+        return None
+
+    now = time.time()
+    _update_job(job_id, status="running", chunks=len(chunks))
+    return {
+        "year": year,
+        "scale": scale,
+        "started": now,
+        "total": 0,
+        # task_id stays None until the chunk has been submitted
+        "parts": [
+            {"geometry": chunk, "task_id": None, "next_poll": now, "delay": POLL_INITIAL_DELAY, "done": False}
+            for chunk in chunks
+        ],
+    }
+
+
+def _back_off(part):
+    part["delay"] = min(part["delay"] * POLL_BACKOFF, POLL_MAX_DELAY)
+    part["next_poll"] = time.time() + part["delay"]
+
+
+def _advance_part(job_id, job, part):
+    """Submit or poll one chunk. Returns an error message if the whole job must fail."""
+    if part["task_id"] is None:
+        try:
+            part["task_id"] = submit_population_task(part["geometry"], job["year"])
+        except Exception as e:
+            # Network or HTTP trouble: try again later
+            part["last_error"] = str(e)
+            _back_off(part)
+            return None
+        part["delay"] = POLL_INITIAL_DELAY
+        part["next_poll"] = time.time() + part["delay"]
+        return None
+
+    try:
+        status, total_population = get_population_task(part["task_id"])
+    except WorldPopTaskError as e:
+        return str(e)
+    except Exception as e:
+        part["last_error"] = str(e)
+        _back_off(part)
+        return None
+
+    if total_population is None:
+        _back_off(part)
+        _update_job(job_id, worldpop_status=status)
+        return None
+
+    part["done"] = True
+    job["total"] += total_population
+    return None
+
+
+def _poll_once(in_flight):
+    """One pass of the poller: wait for the next due chunk or new job, then advance what is due.
+
+    in_flight maps job_id -> job state built by _start_job.
+    """
+    # Block only when there is nothing to poll, otherwise wake up for the next due chunk
+    due_times = [
+        part["next_poll"]
+        for job in in_flight.values() for part in job["parts"] if not part["done"]
+    ]
+    timeout = max(0.0, min(due_times) - time.time()) if due_times else None
+
+    # Pick up everything that was queued since the last pass
+    try:
+        item = _new_jobs.get(timeout=timeout)
+        while True:
+            job_id, geometry, year, scale = item
+            job = _start_job(job_id, geometry, year, scale)
+            if job is not None:
+                in_flight[job_id] = job
+            item = _new_jobs.get_nowait()
+    except queue.Empty:
+        pass
+
+    # Submit or poll the chunks that are due
+    for job_id, job in list(in_flight.items()):
+        error = None
+        for part in job["parts"]:
+            if part["done"] or part["next_poll"] > time.time():
+                continue
+            error = _advance_part(job_id, job, part)
+            if error:
+                break
+
+        now = time.time()
+        if error:
+            del in_flight[job_id]
+            _update_job(job_id, status="failed", error=error)
+        elif all(part["done"] for part in job["parts"]):
+            del in_flight[job_id]
+            _update_job(job_id, status="finished", total_population=job["total"] * job["scale"])
+        elif now - job["started"] > JOB_TIMEOUT:
+            del in_flight[job_id]
+            last_errors = [part["last_error"] for part in job["parts"] if part.get("last_error")]
+            message = "Timed out waiting for WorldPop"
+            if last_errors:
+                message += f" (last error: {last_errors[-1]})"
+            _update_job(job_id, status="failed", error=message)
+
+    _sweep_jobs(time.time())
+
+
+def _poll_loop():
+    in_flight = {}
+    while True:
+        try:
+            _poll_once(in_flight)
+        except Exception as e:
+            # Keep the thread (and the jobs it tracks) alive; the pass is retried
+            print(f"Population job poller error: {e}")
+            time.sleep(POLL_INITIAL_DELAY)
+
+
+def start_job_poller():
+    """Start the single background thread that submits and polls WorldPop tasks."""
+    global _poller_thread
+    with _jobs_lock:
+        if _poller_thread is not None and _poller_thread.is_alive():
+            return
+        _poller_thread = threading.Thread(target=_poll_loop, name="population-jobs", daemon=True)
+        _poller_thread.start()
@@ -0,0 +1,316 @@
+import os
+import glob
+import json
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# -------------------------------
+# Constants
+# -------------------------------
+
+AU_KM = 149597870.7
+SECONDS_PER_DAY = 86400.0
+GAUSS_K_DEG = 0.9856076686  # mean motion in deg/day of a body with a = 1 AU
+UNIX_EPOCH_JD = 2440587.5
+DEFAULT_NEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "neo")
+
+# Earth-Moon barycentre mean elements at J2000 (JPL approximate planetary positions)
+EARTH_ELEMENTS = {
+    "a": 1.00000261,
+    "e": 0.01671123,
+    "i": -0.00001531,
+    "node": 0.0,
+    "peri": 102.93768193,
+    "M0": 100.46457166 - 102.93768193,
+    "epoch": 2451545.0,
+}
+
+KEPLER_TOLERANCE = 1e-12
+KEPLER_MAX_ITER = 30
+# Bodies per worker batch; keeps each (batch x time grid) array to a few tens of MB
+BATCH_SIZE = 64
+REFINE_POINTS = 41
+REFINE_ROUNDS = 3
+
+
+# -------------------------------
+# Loading NeoWs Detail Files
+# -------------------------------
+
+def _iter_neo_records(data):
+    # A /neo/{id} detail file is a single record, a /neo/browse page has a list
+    if "near_earth_objects" in data:
+        objects = data["near_earth_objects"]
+        if isinstance(objects, dict):  # /feed groups by date
+            for day in objects.values():
+                yield from day
+        else:
+            yield from objects
+    else:
+        yield data
+
+
+def load_orbital_elements(neo_dir=DEFAULT_NEO_DIR):
+    """Read every NeoWs JSON file in neo_dir and return the orbital elements as arrays.
+
+    Records without an orbital_data block, or on open (e >= 1) orbits, are skipped.
+    The returned dict also keeps each source record under "records" so results can
+    be fed back into estimate_asteroid_energy.
+    """
+    ids, names, records = [], [], []
+    columns = {key: [] for key in ("a", "e", "i", "node", "peri", "M0", "epoch", "n")}
+
+    for path in sorted(glob.glob(os.path.join(neo_dir, "*.json"))):
+        with open(path) as f:
+            data = json.load(f)
+        for neo in _iter_neo_records(data):
+            orbit = neo.get("orbital_data")
+            if not orbit:
+                continue
+            try:
+                a = float(orbit["semi_major_axis"])
+                e = float(orbit["eccentricity"])
+                row = {
+                    "a": a,
+                    "e": e,
+                    "i": float(orbit["inclination"]),
+                    "node": float(orbit["ascending_node_longitude"]),
+                    "peri": float(orbit["perihelion_argument"]),
+                    "M0": float(orbit["mean_anomaly"]),
+                    "epoch": float(orbit["epoch_osculation"]),
+                    "n": float(orbit.get("mean_motion") or GAUSS_K_DEG / a ** 1.5),
+                }
+            except (KeyError, TypeError, ValueError) as err:
+                print(f"Skipping {neo.get('id')} in {path}: {err}")
+                continue
+            if e >= 1:
+                continue
+            for key, value in row.items():
+                columns[key].append(value)
+            ids.append(neo.get("id"))
+            names.append(neo.get("name"))
+            records.append(neo)
+
+    elements = {key: np.array(values, dtype=float) for key, values in columns.items()}
+    elements["ids"] = ids
+    elements["names"] = names
+    elements["records"] = records
+    return elements
+
+
+# -------------------------------
+# Two-body Propagation
+# -------------------------------
+
+def solve_kepler(M, e):
+    """Solve M = E - e sin E for E element-wise (radians), for arrays of any shape."""
+    M = np.remainder(M, 2 * np.pi)
+    E = np.where(e < 0.8, M, np.pi)
+    for _ in range(KEPLER_MAX_ITER):
+        dE = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+        E = E - dE
+        if np.max(np.abs(dE)) < KEPLER_TOLERANCE:
+            break
+    return E
+
+
+def state_vectors(a, e, i, node, peri, M0, epoch, n, t):
+    """Heliocentric ecliptic position (AU) and velocity (AU/day) at Julian dates t.
+
+    Angles are in degrees and n in deg/day. All arguments broadcast against each
+    other, so elements of shape (N, 1) and times of shape (1, T) give (3, N, T).
+    """
+    i, node, peri = np.radians(i), np.radians(node), np.radians(peri)
+    n_rad = np.radians(n)
+    M = np.radians(M0) + n_rad * (t - epoch)
+    E = solve_kepler(M, e)
+
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    root = np.sqrt(1 - e * e)
+    # Perifocal frame
+    x = a * (cos_E - e)
+    y = a * root * sin_E
+    speed = n_rad * a / (1 - e * cos_E)
+    vx = -speed * sin_E
+    vy = speed * root * cos_E
+
+    cos_w, sin_w = np.cos(peri), np.sin(peri)
+    cos_O, sin_O = np.cos(node), np.sin(node)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    # Rotation perifocal -> ecliptic, first two columns only (z is zero in the perifocal frame)
+    r11 = cos_O * cos_w - sin_O * sin_w * cos_i
+    r12 = -cos_O * sin_w - sin_O * cos_w * cos_i
+    r21 = sin_O * cos_w + cos_O * sin_w * cos_i
+    r22 = -sin_O * sin_w + cos_O * cos_w * cos_i
+    r31 = sin_w * sin_i
+    r32 = cos_w * sin_i
+
+    position = np.stack([r11 * x + r12 * y, r21 * x + r22 * y, r31 * x + r32 * y])
+    velocity = np.stack([r11 * vx + r12 * vy, r21 * vx + r22 * vy, r31 * vx + r32 * vy])
+    return position, velocity
+
+
+def earth_state(t):
+    earth = EARTH_ELEMENTS
+    n = GAUSS_K_DEG / earth["a"] ** 1.5
+    return state_vectors(earth["a"], earth["e"], earth["i"], earth["node"], earth["peri"],
+                         earth["M0"], earth["epoch"], n, t)
+
+
+def _relative_state(batch, t):
+    # batch values have shape (N, 1); t has shape (1, T) or (N, K)
+    position, velocity = state_vectors(batch["a"], batch["e"], batch["i"], batch["node"],
+                                       batch["peri"], batch["M0"], batch["epoch"], batch["n"], t)
+    earth_position, earth_velocity = earth_state(t)
+    return position - earth_position, velocity - earth_velocity
+
+
+def _screen_batch(args):
+    """Closest approach of one batch of bodies over the time grid (runs in a worker process)."""
+    batch, times = args
+    batch = {key: value[:, None] for key, value in batch.items()}
+    rows = np.arange(batch["a"].shape[0])
+
+    # Coarse pass over the whole grid
+    rel_position, _ = _relative_state(batch, times[None, :])
+    distance = np.sqrt(np.sum(rel_position ** 2, axis=0))
+    best = np.argmin(distance, axis=1)
+    t_best = times[best]
+
+    # Zoom in around each body's coarse minimum
+    half_window = (times[1] - times[0]) if times.size > 1 else 0.0
+    offsets = np.linspace(-1.0, 1.0, REFINE_POINTS)
+    for _ in range(REFINE_ROUNDS):
+        t_local = np.clip(t_best[:, None] + half_window * offsets[None, :], times[0], times[-1])
+        rel_position, _ = _relative_state(batch, t_local)
+        distance = np.sqrt(np.sum(rel_position ** 2, axis=0))
+        t_best = t_local[rows, np.argmin(distance, axis=1)]
+        half_window = 2 * half_window / (REFINE_POINTS - 1)
+
+    rel_position, rel_velocity = _relative_state(batch, t_best[:, None])
+    min_distance_au = np.sqrt(np.sum(rel_position[:, :, 0] ** 2, axis=0))
+    relative_speed = np.sqrt(np.sum(rel_velocity[:, :, 0] ** 2, axis=0))
+    return min_distance_au, t_best, relative_speed
+
+
+# -------------------------------
+# Screening
+# -------------------------------
+
+def date_to_jd(date):
+    """Julian date of a datetime or 'YYYY-MM-DD[ HH:MM:SS]' string (UTC)."""
+    if isinstance(date, str):
+        date = datetime.fromisoformat(date)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp() / SECONDS_PER_DAY + UNIX_EPOCH_JD
+
+
+def jd_to_datetime(jd):
+    return datetime.fromtimestamp((jd - UNIX_EPOCH_JD) * SECONDS_PER_DAY, tz=timezone.utc)
+
+
+def screen_close_approaches(elements, start, end, step_days=1.0, workers=None):
+    """Find each body's closest approach to Earth between start and end.
+
+    elements is the dict returned by load_orbital_elements (element arrays may be
+    edited first for what-if deflections). The grid is scanned at step_days and
+    each minimum is then refined to well under a minute. Batches of bodies are
+    spread across a process pool; workers=1 runs everything in this process.
+
+    Returns a dict of arrays: min_distance_km, min_distance_au, time_jd and
+    relative_velocity_km_s, plus the matching ids and names.
+    """
+    start_jd, end_jd = date_to_jd(start), date_to_jd(end)
+    if end_jd < start_jd:
+        raise ValueError("end must not be before start")
+    if step_days <= 0:
+        raise ValueError("step_days must be positive")
+    times = np.arange(start_jd, end_jd + step_days / 2, step_days)
+    keys = ("a", "e", "i", "node", "peri", "M0", "epoch", "n")
+    count = len(elements["a"])
+    jobs = [
+        ({key: elements[key][lo:lo + BATCH_SIZE] for key in keys}, times)
+        for lo in range(0, count, BATCH_SIZE)
+    ]
+
+    if workers == 1 or len(jobs) <= 1:
+        parts = [_screen_batch(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_screen_batch, jobs))
+
+    if parts:
+        min_distance_au, time_jd, speed = (np.concatenate(column) for column in zip(*parts))
+    else:
+        min_distance_au = time_jd = speed = np.empty(0)
+
+    return {
+        "ids": elements["ids"],
+        "names": elements["names"],
+        "min_distance_au": min_distance_au,
+        "min_distance_km": min_distance_au * AU_KM,
+        "time_jd": time_jd,
+        "relative_velocity_km_s": speed * AU_KM / SECONDS_PER_DAY,
+    }
+
+
+def close_approach_record(result, index):
+    """One screening result in NeoWs close_approach_data format."""
+    when = jd_to_datetime(result["time_jd"][index])
+    distance_au = float(result["min_distance_au"][index])
+    v_km_s = float(result["relative_velocity_km_s"][index])
+    return {
+        "close_approach_date": when.strftime("%Y-%m-%d"),
+        "close_approach_date_full": when.strftime("%Y-%b-%d %H:%M"),
+        "epoch_date_close_approach": int(when.timestamp() * 1000),
+        "relative_velocity": {
+            "kilometers_per_second": str(v_km_s),
+            "kilometers_per_hour": str(v_km_s * 3600),
+            "miles_per_hour": str(v_km_s * 3600 / 1.609344)
+        },
+        "miss_distance": {
+            "astronomical": str(distance_au),
+            "lunar": str(distance_au * AU_KM / 384400),
+            "kilometers": str(distance_au * AU_KM),
+            "miles": str(distance_au * AU_KM / 1.609344)
+        },
+        "orbiting_body": "Earth"
+    }
+
+
+def with_screened_approach(elements, result, index):
+    """Copy of the source NEO record whose first close approach is the screened one,
+    ready to pass to estimate_asteroid_energy."""
+    asteroid = dict(elements["records"][index])
+    asteroid["close_approach_data"] = [close_approach_record(result, index)] + list(
+        asteroid.get("close_approach_data", [])
+    )
+    return asteroid
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Screen local NeoWs orbits for close approaches to Earth.")
+    parser.add_argument("start", help="start date, YYYY-MM-DD")
+    parser.add_argument("end", help="end date, YYYY-MM-DD")
+    parser.add_argument("--dir", default=DEFAULT_NEO_DIR, help="directory of NeoWs JSON files")
+    parser.add_argument("--step", type=float, default=1.0, help="grid step in days")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20, help="number of closest approaches to print")
+    args = parser.parse_args()
+
+    elements = load_orbital_elements(args.dir)
+    started = time.perf_counter()
+    result = screen_close_approaches(elements, args.start, args.end, args.step, args.workers)
+    print(f"Screened {len(elements['a'])} objects in {time.perf_counter() - started:.1f}s")
+
+    for index in np.argsort(result["min_distance_km"])[:args.top]:
+        when = jd_to_datetime(result["time_jd"][index]).strftime("%Y-%m-%d %H:%M")
+        print(f"{result['names'][index]:<30} {when}  "
+              f"{result['min_distance_km'][index]:>14.0f} km  "
+              f"{result['relative_velocity_km_s'][index]:.2f} km/s")
@@ -1,8 +1,19 @@
 import math
 import json
-import requests
-from flask import jsonify, request
-from shapely.geometry import Polygon, mapping
+from urllib.parse import quote
+# requests and shapely are imported inside the functions that use them so importing this module stays cheap
+
+WORLDPOP_STATS_URL = "https://api.worldpop.org/v1/services/stats"
+WORLDPOP_TASKS_URL = "https://api.worldpop.org/v1/tasks"
+# The geojson goes in the query string, so keep each request well under common URL limits.
+# Measured after URL-encoding, which roughly doubles the length of raw geojson.
+MAX_GEOJSON_CHARS = 6000
+# Safety net for the recursive splitting of oversized polygons
+MAX_SPLIT_DEPTH = 12
+
+
+class WorldPopTaskError(ValueError):
+    """WorldPop reported that an async task itself failed; retrying the poll will not help."""
 
 
 def get_bounding_box(lat, lon, distance_km):
@@ -12,34 +23,43 @@ def get_bounding_box(lat, lon, distance_km):
     return lat - delta_lat, lon - delta_lon, lat + delta_lat, lon + delta_lon
 
 
-def get_total_population(lat, lon, distance_km, year):
+def get_zone_polygon(lat, lon, distance_km):
+    """Return the square polygon (lon/lat order) covering ±distance_km around a point."""
+    from shapely.geometry import Polygon
 
-    # Get bounding box coordinates
     lat1, lon1, lat2, lon2 = get_bounding_box(lat, lon, distance_km)
-
-    # Create polygon
-    polygon = Polygon([
+    return Polygon([
         (lon1, lat1),
         (lon1, lat2),
         (lon2, lat2),
         (lon2, lat1),
         (lon1, lat1)
     ])
+
+
+def geometry_to_geojson_str(geometry):
+    from shapely.geometry import mapping
+
     geojson = {"type": "FeatureCollection", "features": [
-        {"type": "Feature", "properties": {}, "geometry": mapping(polygon)}
+        {"type": "Feature", "properties": {}, "geometry": mapping(geometry)}
     ]}
-    geojson_str = json.dumps(geojson, separators=(",", ":"))
+    return json.dumps(geojson, separators=(",", ":"))
+
+
+def get_population_for_geometry(geometry, year):
+    """Fetch total population inside any (Multi)Polygon using WorldPop API."""
+    import requests
+
 
     # WorldPop API request
-    url = "https://api.worldpop.org/v1/services/stats"
     params = {
         "dataset": "wpgppop",
         "year": year,
-        "geojson": geojson_str,
+        "geojson": geometry_to_geojson_str(geometry),
         "runasync": "false"
     }
 
-    response = requests.get(url, params=params, timeout=120)
+    response = requests.get(WORLDPOP_STATS_URL, params=params, timeout=120)
     response.raise_for_status()
     data = response.json()
 
@@ -49,3 +69,149 @@ def get_total_population(lat, lon, distance_km, year):
         raise ValueError(f"Unexpected response:\n{json.dumps(data, indent=2)}")
 
     return total_population
+
+
+def submit_population_task(geometry, year):
+    """Start an async WorldPop stats query and return its task id without waiting."""
+    import requests
+
+    params = {
+        "dataset": "wpgppop",
+        "year": year,
+        "geojson": geometry_to_geojson_str(geometry),
+        "runasync": "true"
+    }
+
+    response = requests.get(WORLDPOP_STATS_URL, params=params, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+
+    task_id = data.get("taskid")
+    if not task_id:
+        raise ValueError(f"Unexpected response:\n{json.dumps(data, indent=2)}")
+
+    return task_id
+
+
+def get_population_task(task_id):
+    """Poll a WorldPop task. Returns (status, total_population); population is None until finished."""
+    import requests
+
+    response = requests.get(f"{WORLDPOP_TASKS_URL}/{task_id}", timeout=30)
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get("error"):
+        raise WorldPopTaskError(data.get("error_message") or f"WorldPop task {task_id} failed")
+
+    status = data.get("status")
+    if status != "finished":
+        return status, None
+
+    total_population = (data.get("data") or {}).get("total_population", None)
+    if total_population is None:
+        raise WorldPopTaskError(f"Unexpected response:\n{json.dumps(data, indent=2)}")
+
+    return status, total_population
+
+
+def get_total_population(lat, lon, distance_km, year):
+    return get_population_for_geometry(get_zone_polygon(lat, lon, distance_km), year)
+
+
+def encoded_geojson_length(geometry):
+    """Length of the geometry's geojson once URL-encoded into the query string."""
+    return len(quote(geometry_to_geojson_str(geometry), safe=""))
+
+
+def _polygon_parts(geometry):
+    # Polygons with area from any geometry an intersection can return
+    if geometry.geom_type == "Polygon":
+        return [geometry] if geometry.area > 0 else []
+    if geometry.geom_type in ("MultiPolygon", "GeometryCollection"):
+        parts = []
+        for part in geometry.geoms:
+            parts.extend(_polygon_parts(part))
+        return parts
+    return []
+
+
+def split_polygon(polygon, max_chars=MAX_GEOJSON_CHARS, depth=0):
+    """Clip a polygon into halves of its bounding box until every piece fits in max_chars.
+
+    The halves only share edges, so the pieces never overlap.
+    """
+    from shapely.geometry import box
+
+    if encoded_geojson_length(polygon) <= max_chars:
+        return [polygon]
+    if depth >= MAX_SPLIT_DEPTH:
+        # Sending it anyway would just fail upstream on the URL length
+        raise ValueError(f"Polygon still exceeds {max_chars} encoded characters after {depth} splits")
+
+    min_x, min_y, max_x, max_y = polygon.bounds
+    if max_x - min_x >= max_y - min_y:
+        mid = (min_x + max_x) / 2
+        halves = [box(min_x, min_y, mid, max_y), box(mid, min_y, max_x, max_y)]
+    else:
+        mid = (min_y + max_y) / 2
+        halves = [box(min_x, min_y, max_x, mid), box(min_x, mid, max_x, max_y)]
+
+    pieces = []
+    for half in halves:
+        for part in _polygon_parts(polygon.intersection(half)):
+            pieces.extend(split_polygon(part, max_chars, depth + 1))
+    return pieces
+
+
+def chunk_geometry(geometry, max_chars=MAX_GEOJSON_CHARS):
+    """Split a (Multi)Polygon into disjoint pieces whose geojson fits in one request.
+
+    The parts of a unary_union result never overlap, so the populations of
+    the chunks can simply be added up. Parts that are too big on their own are
+    clipped into smaller pieces first, then pieces are packed greedily.
+    """
+    from shapely.geometry import MultiPolygon
+
+    if geometry.is_empty:
+        return []
+    if encoded_geojson_length(geometry) <= max_chars:
+        return [geometry]
+
+    pieces = []
+    for part in _polygon_parts(geometry):
+        pieces.extend(split_polygon(part, max_chars))
+
+    chunks = []
+    current = []
+    for piece in pieces:
+        candidate = current + [piece]
+        if current and encoded_geojson_length(MultiPolygon(candidate)) > max_chars:
+            chunks.append(MultiPolygon(current))
+            current = [piece]
+        else:
+            current = candidate
+    if current:
+        chunks.append(MultiPolygon(current))
+    return chunks
+
+
+def get_union_geometry(locations, distance_km):
+    """Merge the zone boxes of a list of {"lat", "lon"} dicts into one (Multi)Polygon."""
+    from shapely.ops import unary_union
+
+    polygons = [get_zone_polygon(float(loc["lat"]), float(loc["lon"]), distance_km) for loc in locations]
+    return unary_union(polygons)
+
+
+def get_union_population(locations, distance_km, year):
+    """Population covered by the union of every zone box, counting overlaps once.
+
+    locations is a list of dicts with "lat" and "lon".
+    """
+    union = get_union_geometry(locations, distance_km)
+
+    total_population = 0
+    for chunk in chunk_geometry(union):
+        total_population += get_population_for_geometry(chunk, year)
+    return total_population
@@ -0,0 +1,118 @@
+import json
+import queue
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import pytest
+
+import catalogue
+
+
+def event(lat, lon, mag, when, place="somewhere"):
+    return {
+        "geometry": {"coordinates": [lon, lat, 10.0]},
+        "properties": {"title": f"M {mag} - {place}", "place": place, "mag": mag, "url": "",
+                       "tsunami": 0, "time": int(when.timestamp() * 1000)},
+    }
+
+
+def month_geojson(month):
+    return {"features": [
+        event(10.0, 20.0, 3.0 + month, datetime(2020, month, 5, tzinfo=timezone.utc)),
+        event(10.5, 20.0, 2.6, datetime(2020, month, 20, tzinfo=timezone.utc), place="Bío-Bío, Chile"),
+        event(40.0, 40.0, 5.0, datetime(2020, month, 6, tzinfo=timezone.utc)),
+    ]}
+
+
+@pytest.fixture
+def shard_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalogue, "SHARD_DIR", str(tmp_path))
+    monkeypatch.setattr(catalogue, "_resident_shards", OrderedDict())
+    monkeypatch.setattr(catalogue, "MAX_RESIDENT_SHARDS", 3)
+    # Isolated background fetcher that can never reach USGS
+    monkeypatch.setattr(catalogue, "_fetch_queue", queue.Queue())
+    monkeypatch.setattr(catalogue, "_queued_fetches", set())
+    monkeypatch.setattr(catalogue, "_fetch_thread", None)
+
+    def no_network(key):
+        raise AssertionError(f"unexpected fetch of {key}")
+
+    monkeypatch.setattr(catalogue, "_fetch_month", no_network)
+    for month in (1, 2, 3):
+        catalogue._save_snapshot(f"2020-{month:02d}", catalogue.shard_arrays(month_geojson(month)))
+    yield tmp_path
+    # Runs before monkeypatch restores the module globals
+    catalogue.stop_fetcher()
+
+
+def test_query_filters_time_and_magnitude(shard_dir):
+    start, end = catalogue.parse_time("2020-01-10"), catalogue.parse_time("2020-03-10")
+    results = catalogue.query_nearby(10.0, 20.0, 800, start, end)
+    assert [eq["magnitude"] for eq in results] == [6.0, 5.0, 2.6, 2.6]
+    assert results[-1]["place"] == "Bío-Bío, Chile"
+    assert set(results[0]) == {"title", "place", "magnitude", "url", "tsunami", "time", "lat", "lon", "distance_km"}
+
+    strong = catalogue.query_nearby(10.0, 20.0, 800, start, end, min_magnitude=4.5)
+    assert [eq["magnitude"] for eq in strong] == [6.0, 5.0]
+
+
+def test_lru_bound_on_resident_shards(shard_dir, monkeypatch):
+    monkeypatch.setattr(catalogue, "MAX_RESIDENT_SHARDS", 2)
+    for key in ("2020-01", "2020-02", "2020-03"):
+        catalogue.get_shard(key)
+    assert list(catalogue._resident_shards) == ["2020-02", "2020-03"]
+
+
+def test_query_longer_than_the_cache_is_rejected(shard_dir, monkeypatch):
+    monkeypatch.setattr(catalogue, "MAX_RESIDENT_SHARDS", 2)
+    start, end = catalogue.parse_time("2020-01-01"), catalogue.parse_time("2020-03-31")
+    with pytest.raises(ValueError):
+        catalogue.query_nearby(10.0, 20.0, 800, start, end)
+    # Nothing was loaded, so nothing was evicted either
+    assert not catalogue._resident_shards
+
+
+def test_repeated_query_reuses_resident_shards(shard_dir, monkeypatch):
+    start, end = catalogue.parse_time("2020-01-01"), catalogue.parse_time("2020-03-31")
+    catalogue.query_nearby(10.0, 20.0, 800, start, end)
+
+    def fail_load(key):
+        raise AssertionError(f"{key} was reloaded from disk")
+
+    monkeypatch.setattr(catalogue, "_load_snapshot", fail_load)
+    assert len(catalogue.query_nearby(10.0, 20.0, 800, start, end)) == 6
+
+
+def test_legacy_geojson_snapshot_is_converted(shard_dir):
+    with open(shard_dir / "2019-12.json", "w") as f:
+        json.dump(month_geojson(1), f)
+    shard = catalogue.get_shard("2019-12")
+    assert len(shard["coords"]) == 3
+    assert (shard_dir / "2019-12.npz").exists()
+
+
+def test_missing_month_is_fetched_in_background(shard_dir, monkeypatch):
+    fetched = []
+
+    def fake_fetch(key):
+        fetched.append(key)
+        return catalogue.shard_arrays({"features": []})
+
+    monkeypatch.setattr(catalogue, "_fetch_month", fake_fetch)
+    start, end = catalogue.parse_time("2020-03-01"), catalogue.parse_time("2020-04-30")
+    with pytest.raises(catalogue.ShardUnavailable) as err:
+        catalogue.query_nearby(10.0, 20.0, 800, start, end)
+    assert err.value.months == ["2020-04"]
+
+    deadline = time.time() + 5
+    while not fetched and time.time() < deadline:
+        time.sleep(0.01)
+    assert fetched == ["2020-04"]
+
+
+def test_window_is_bounded(shard_dir):
+    with pytest.raises(ValueError):
+        catalogue.query_nearby(10.0, 20.0, 800, catalogue.parse_time("1900-01-01"), datetime.now(timezone.utc))
+    with pytest.raises(ValueError):
+        catalogue.get_shard("2999-01")
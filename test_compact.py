@@ -0,0 +1,63 @@
+import gzip
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("GOTG_LOAD_CATALOGUE", "0")
+
+import app  # noqa: E402
+import compact  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def test_default_json_varies_on_accept(client):
+    response = client.get("/neo")
+    assert response.mimetype == "application/json"
+    assert "Accept" in response.headers["Vary"]
+    assert isinstance(response.get_json(), list)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"query_string": {"format": "columnar"}},
+    {"headers": {"Accept": compact.COLUMNAR_MIMETYPE}},
+])
+def test_columnar_selected_by_query_or_accept(client, kwargs):
+    response = client.get("/neo", **kwargs)
+    assert response.mimetype == compact.COLUMNAR_MIMETYPE
+    assert "Accept" in response.headers["Vary"]
+    payload = json.loads(response.get_data())
+    assert payload["count"] == len(app.Ass)
+    assert set(payload["columns"]) == set(compact.NEO_COLUMNS)
+    # Signed coordinates from the "° N/W" strings
+    assert payload["columns"]["lon"][0] == pytest.approx(-6.2216)
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/neo?format=xml").status_code == 400
+
+
+def test_missing_msgpack_status_depends_on_how_it_was_asked_for(client, monkeypatch):
+    monkeypatch.setattr(compact, "msgpack", None)
+    assert client.get("/neo?format=msgpack").status_code == 400
+    assert client.get("/neo", headers={"Accept": compact.MSGPACK_MIMETYPE}).status_code == 406
+
+
+def test_compression_negotiation(monkeypatch):
+    monkeypatch.setattr(compact, "brotli", None)
+    big = b"x" * (compact.MIN_COMPRESS_BYTES * 4)
+
+    with app.app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        body, encoding = compact._compress(big)
+        assert encoding == "gzip"
+        assert gzip.decompress(body) == big
+        # Small bodies are left alone
+        assert compact._compress(b"small") == (b"small", None)
+
+    with app.app.test_request_context(headers={"Accept-Encoding": "br"}):
+        # No brotli installed and gzip not accepted
+        assert compact._compress(big) == (big, None)
@@ -0,0 +1,116 @@
+import queue
+import time
+
+import pytest
+
+import jobs
+from pop import WorldPopTaskError
+
+
+@pytest.fixture(autouse=True)
+def isolated_jobs(monkeypatch):
+    # Fresh state, no real poller thread and no waiting between polls
+    monkeypatch.setattr(jobs, "population_jobs", {})
+    monkeypatch.setattr(jobs, "_new_jobs", queue.Queue())
+    monkeypatch.setattr(jobs, "start_job_poller", lambda: None)
+    monkeypatch.setattr(jobs, "POLL_INITIAL_DELAY", 0.0)
+    monkeypatch.setattr(jobs, "POLL_MAX_DELAY", 0.0)
+    monkeypatch.setattr(jobs, "chunk_geometry", lambda geometry: list(geometry))
+
+
+def run_until_done(job_id, max_passes=100):
+    in_flight = {}
+    for _ in range(max_passes):
+        jobs._poll_once(in_flight)
+        job = jobs.get_population_job(job_id)
+        if job["status"] in ("finished", "failed"):
+            return job
+    raise AssertionError(f"job still {job['status']} after {max_passes} passes")
+
+
+def test_chunks_are_summed_and_scaled(monkeypatch):
+    populations = {"a": 100, "b": 20, "c": 3}
+    monkeypatch.setattr(jobs, "submit_population_task", lambda chunk, year: f"task-{chunk}")
+    monkeypatch.setattr(jobs, "get_population_task", lambda task_id: ("finished", populations[task_id[-1]]))
+
+    job = run_until_done(jobs.create_population_job(["a", "b", "c"], 2020, scale=0.5))
+
+    assert job["status"] == "finished"
+    assert job["chunks"] == 3
+    assert job["total_population"] == pytest.approx(61.5)
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    submits, polls = [], []
+
+    def submit(chunk, year):
+        submits.append(chunk)
+        if len(submits) == 1:
+            raise ConnectionError("502 Bad Gateway")
+        return "task"
+
+    def poll(task_id):
+        polls.append(task_id)
+        if len(polls) == 1:
+            raise TimeoutError("read timed out")
+        if len(polls) == 2:
+            return "started", None
+        return "finished", 42
+
+    monkeypatch.setattr(jobs, "submit_population_task", submit)
+    monkeypatch.setattr(jobs, "get_population_task", poll)
+
+    job = run_until_done(jobs.create_population_job(["a"], 2020))
+
+    assert job["status"] == "finished"
+    assert job["total_population"] == 42
+    assert len(submits) == 2
+    assert len(polls) == 3
+
+
+def test_worldpop_task_error_fails_the_job(monkeypatch):
+    monkeypatch.setattr(jobs, "submit_population_task", lambda chunk, year: "task")
+
+    def poll(task_id):
+        raise WorldPopTaskError("dataset not available")
+
+    monkeypatch.setattr(jobs, "get_population_task", poll)
+
+    job = run_until_done(jobs.create_population_job(["a", "b"], 2020))
+
+    assert job["status"] == "failed"
+    assert job["error"] == "dataset not available"
+
+
+def test_job_times_out_with_last_error(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_TIMEOUT", 0.05)
+    monkeypatch.setattr(jobs, "submit_population_task", lambda chunk, year: "task")
+
+    def poll(task_id):
+        time.sleep(0.01)
+        raise TimeoutError("read timed out")
+
+    monkeypatch.setattr(jobs, "get_population_task", poll)
+    job = run_until_done(jobs.create_population_job(["a"], 2020))
+
+    assert job["status"] == "failed"
+    assert "read timed out" in job["error"]
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(jobs, "POLL_MAX_DELAY", 30.0)
+    part = {"delay": 1.0}
+    delays = []
+    for _ in range(7):
+        jobs._back_off(part)
+        delays.append(part["delay"])
+    assert delays == [2.0, 4.0, 8.0, 16.0, 30.0, 30.0, 30.0]
+
+
+def test_orphaned_job_is_failed_on_read():
+    job_id = jobs.create_population_job(["a"], 2020)
+    jobs.population_jobs[job_id]["created_at"] -= jobs.JOB_TIMEOUT + jobs.ORPHAN_GRACE + 1
+
+    job = jobs.get_population_job(job_id)
+
+    assert job["status"] == "failed"
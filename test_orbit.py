@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import orbit
+
+
+def random_elements(count, seed=1):
+    rng = np.random.default_rng(seed)
+    elements = {
+        "a": rng.uniform(0.8, 2.5, count),
+        "e": rng.uniform(0.0, 0.6, count),
+        "i": rng.uniform(0.0, 5.0, count),
+        "node": rng.uniform(0.0, 360.0, count),
+        "peri": rng.uniform(0.0, 360.0, count),
+        "M0": rng.uniform(0.0, 360.0, count),
+        "epoch": np.full(count, 2460000.5),
+    }
+    elements["n"] = orbit.GAUSS_K_DEG / elements["a"] ** 1.5
+    elements["ids"] = elements["names"] = list(range(count))
+    return elements
+
+
+def test_solve_kepler_satisfies_equation():
+    rng = np.random.default_rng(0)
+    M = rng.uniform(0, 2 * np.pi, 1000)
+    e = rng.uniform(0, 0.95, 1000)
+    E = orbit.solve_kepler(M, e)
+    assert np.allclose(E - e * np.sin(E), M, atol=1e-10)
+
+
+def test_velocity_matches_finite_difference():
+    a = 1.5
+    t = np.array([2460000.0, 2460000.001])
+    position, velocity = orbit.state_vectors(a, 0.4, 10.0, 30.0, 50.0, 20.0, 2451545.0,
+                                             orbit.GAUSS_K_DEG / a ** 1.5, t)
+    finite_difference = (position[:, 1] - position[:, 0]) / (t[1] - t[0])
+    assert np.allclose(finite_difference, velocity[:, 0], rtol=1e-3)
+
+
+def test_refined_minimum_matches_brute_force_grid():
+    elements = random_elements(20)
+    result = orbit.screen_close_approaches(elements, "2025-01-01", "2026-01-01", workers=1)
+
+    # Brute force on a 1-minute grid
+    times = np.arange(orbit.date_to_jd("2025-01-01"), orbit.date_to_jd("2026-01-01"), 1 / 1440)
+    batch = {key: elements[key][:, None] for key in ("a", "e", "i", "node", "peri", "M0", "epoch", "n")}
+    rel_position, _ = orbit._relative_state(batch, times[None, :])
+    brute_km = np.sqrt(np.sum(rel_position ** 2, axis=0)).min(axis=1) * orbit.AU_KM
+
+    assert np.allclose(result["min_distance_km"], brute_km, rtol=1e-5)
+    # The refined search can only do as well as or better than a fixed grid
+    assert np.all(result["min_distance_km"] <= brute_km * (1 + 1e-9))
+
+
+def test_end_before_start_is_rejected():
+    with pytest.raises(ValueError):
+        orbit.screen_close_approaches(random_elements(2), "2026-01-01", "2025-01-01", workers=1)
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+from shapely.geometry import Point
+from shapely.ops import unary_union
+
+import pop
+
+
+def random_locations(count, seed, lat_range, lon_range):
+    rng = random.Random(seed)
+    return [{"lat": rng.uniform(*lat_range), "lon": rng.uniform(*lon_range)} for _ in range(count)]
+
+
+@pytest.mark.parametrize("geometry", [
+    # Hundreds of overlapping boxes merge into one big polygon
+    pop.get_union_geometry(random_locations(600, 1, (0, 20), (0, 20)), 70),
+    # Scattered boxes stay a MultiPolygon
+    pop.get_union_geometry(random_locations(300, 2, (-50, 50), (-170, 170)), 70),
+    # A single polygon with many vertices
+    Point(0, 0).buffer(5, 400),
+])
+def test_chunks_fit_and_cover_the_union(geometry):
+    assert pop.encoded_geojson_length(geometry) > pop.MAX_GEOJSON_CHARS
+    chunks = pop.chunk_geometry(geometry)
+
+    assert len(chunks) > 1
+    assert all(pop.encoded_geojson_length(chunk) <= pop.MAX_GEOJSON_CHARS for chunk in chunks)
+    assert sum(chunk.area for chunk in chunks) == pytest.approx(geometry.area, rel=1e-9)
+    assert unary_union(chunks).symmetric_difference(geometry).area == pytest.approx(0, abs=1e-9)
+
+
+def test_small_geometry_is_one_chunk():
+    polygon = pop.get_zone_polygon(10, 20, 70)
+    assert pop.chunk_geometry(polygon) == [polygon]
+
+
+def test_unsplittable_polygon_raises(monkeypatch):
+    monkeypatch.setattr(pop, "MAX_SPLIT_DEPTH", 1)
+    with pytest.raises(ValueError):
+        pop.chunk_geometry(Point(0, 0).buffer(5, 400))
@@ -175,6 +175,7 @@ export default function Results() {
   const [impactLoading, setImpactLoading] = useState(true);
   const [apiResponse, setApiResponse] = useState(null);
   const [impactData, setImpactData] = useState(null);
+  const [impactError, setImpactError] = useState(null);
 
   // Fetch nearby earthquake/tsunami data
   useEffect(() => {
@@ -205,6 +206,8 @@ export default function Results() {
     const fetchPopulationImpact = async () => {
       if (!zones || zones.length === 0) return;
       setImpactLoading(true);
+      setImpactData(null);
+      setImpactError(null);
       try {
         const payload = {
           locations: zones.map((z) => ({
@@ -212,11 +215,38 @@ export default function Results() {
             lon: z.lon,
           })),
         };
-        const response = await ApiService.post("get_population_and_impact_multiple", payload);
-        console.log("Population & impact data:", response);
-        setImpactData(response);
+        // Show provisional running totals as each zone resolves, then replace them with the aggregate.
+        // The running sum counts overlapping zones twice, so it must never be left as the final result.
+        let gotAggregate = false;
+        await ApiService.stream("get_population_and_impact_multiple/stream", payload, (record) => {
+          if (record.type === "aggregate") {
+            console.log("Population & impact data:", record);
+            gotAggregate = true;
+            if (record.error) {
+              setImpactData(null);
+              setImpactError(record.error);
+            } else {
+              setImpactData(record);
+            }
+          } else if (!record.error) {
+            setImpactData((prev) => ({
+              provisional: true,
+              total_population: (prev?.total_population || 0) + record.total_population,
+              impact_effects: {
+                ...record.impact_effects,
+                estimated_population_effect:
+                  (prev?.impact_effects.estimated_population_effect || 0) +
+                  record.impact_effects.estimated_population_effect,
+              },
+            }));
+          }
+          setImpactLoading(false);
+        });
+        if (!gotAggregate) throw new Error("Stream ended before the final result");
       } catch (error) {
         console.error("Error fetching population and impact data:", error);
+        setImpactData(null);
+        setImpactError(error.message);
       } finally {
         setImpactLoading(false);
       }
@@ -278,6 +308,12 @@ export default function Results() {
             </Box>
           </SimpleGrid>
 
+          {impactError && (
+            <Text textAlign="center" color="red.300" mt={12}>
+              Could not compute the population impact: {impactError}
+            </Text>
+          )}
+
           {impactData && (
             <Box
               mt={12}
@@ -291,6 +327,11 @@ export default function Results() {
               <Heading size="md" mb={4} color="whiteAlpha.900" textAlign="center" letterSpacing="wide">
                 🌍 Population Impact Overview
               </Heading>
+              {impactData.provisional && (
+                <Text textAlign="center" color="yellow.300" mb={4}>
+                  Provisional: running per-zone totals, overlapping zones may be counted twice until the final result arrives.
+                </Text>
+              )}
 
               <SimpleGrid columns={{ base: 1, md: 3 }} spacing={6}>
                 <Box
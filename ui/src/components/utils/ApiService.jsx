@@ -19,6 +19,31 @@ class ApiService {
     return response.json();
   }
 
+  // POST and call onRecord for every newline-delimited JSON record as it arrives
+  static async stream(endpoint, data, onRecord) {
+    const response = await fetch(`${BASE_URL}/${endpoint}`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(data),
+    });
+    if (!response.ok) throw new Error(`POST ${endpoint} failed`);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split("\n");
+      buffer = lines.pop();
+      for (const line of lines) {
+        if (line.trim()) onRecord(JSON.parse(line));
+      }
+    }
+    if (buffer.trim()) onRecord(JSON.parse(buffer));
+  }
+
   static async put(endpoint, data) {
     const response = await fetch(`${BASE_URL}/${endpoint}`, {
       method: "PUT",